@@ -51,12 +51,36 @@ import time
 import sys
 import os
 import json
+import asyncio
+import functools
+from typing import Optional, Union
 import Smoker_Secrets
 import influxdb_client
-from influxdb_client import Point
-from influxdb_client.client.write_api import SYNCHRONOUS
-from datetime import datetime, timezone
-import serial
+from influxdb_client.client.write_api import WriteOptions
+import serial_asyncio
+
+# Prefer orjson for JSON handling, its C implementation is several times faster than the standard library
+try:
+    import orjson
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+except ImportError:
+    json_loads = json.loads
+
+    def json_dumps(obj):
+        return json.dumps(obj).encode('utf-8')
+
+# Prefer msgspec for Pico telemetry, it decodes straight into a typed struct without building a dict
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# Kernel file change notifications are Linux only, fall back to polling without them
+try:
+    from asyncinotify import Inotify, Mask
+except ImportError:
+    Inotify = None
 
 
 ####################################################################################################################### 
@@ -69,24 +93,133 @@ logger.info("Defining constants...")
 SERIAL_PORT       = '/dev/ttyACM0'
 SERIAL_BAUD         = 115200
 PICO_RECONNECT_INTERVAL = 3
+CONTROL_RESEND_INTERVAL = 10  # Resend unchanged commands every 10 seconds, well within the Pico's 30 second cooking timeout
+
+# Fixed commands for the Pico, encoded once instead of on every send
+CMD_HEATER_ON   = b'HEATER_STATE 1\n'
+CMD_HEATER_OFF  = b'HEATER_STATE 0\n'
+CMD_COOKING_ON  = b'COOKING_STATE 1\n'
+CMD_COOKING_OFF = b'COOKING_STATE 0\n'
 
 # File paths
 PARAMS_FILE = "/home/user/OpenSmoker_Parameters.json"
+PARAMS_FILE_TMP = PARAMS_FILE + ".tmp"  # Written first, then renamed over PARAMS_FILE
 SAVE_INTERVAL = 10  # Save parameters every 10 seconds
 MAX_PARAM_AGE = 7200  # Maximum age of saved parameters in seconds (2 hours)
 
-# Last saved parameters
-last_saved_params = {
-    "temp_air_target": None,
-    "temp_meat_1_target": None,
-    "cooking_on": None,
-    "smoker_rate": None,
-    "timestamp": None
+# Pico telemetry keys mapped to the state attribute they update and an optional value conversion
+PICO_FIELD_HANDLERS = {
+    'temp_air_top':    ('temp_air_top', None),
+    'temp_air_bottom': ('temp_air_bottom', None),
+    'temp_meat':       ('temp_meat_1', None),
+    'heater_state':    ('heater_state_reported', lambda value: value == 'ON'),
+    'fan_state':       ('fan_state_reported', lambda value: value == 'ON'),
+    'smoker_state':    ('smoker_state', lambda value: value == 'ON'),
+    'smoker_rate':     ('smoker_rate', None)
 }
 
+# Schema of the Pico telemetry line for msgspec, keys missing from a line stay None
+# Temperatures arrive as ints or floats, both are accepted and kept as sent like the dict fallback does
+if msgspec is not None:
+    class PicoFrame(msgspec.Struct):
+        temp_air_top:    Optional[Union[int, float]] = None
+        temp_air_bottom: Optional[Union[int, float]] = None
+        temp_meat:       Optional[Union[int, float]] = None
+        heater_state:    Optional[str] = None
+        fan_state:       Optional[str] = None
+        smoker_state:    Optional[str] = None
+        smoker_rate:     Optional[int] = None
+
+    PICO_FRAME_DECODER = msgspec.json.Decoder(PicoFrame)
+    PICO_DECODE_ERRORS = (json.JSONDecodeError, msgspec.DecodeError)
+else:
+    PICO_FRAME_DECODER = None
+    PICO_DECODE_ERRORS = (json.JSONDecodeError,)
+
+# InfluxDB connection settings, read from Smoker_Secrets once at startup
+INFLUX_URL    = Smoker_Secrets.INFLUX_URL
+INFLUX_TOKEN  = Smoker_Secrets.INFLUX_TOKEN
+INFLUX_ORG    = Smoker_Secrets.INFLUX_ORG
+INFLUX_BUCKET = Smoker_Secrets.INFLUX_BUCKET
+
 INFLUXDB_RECONNECT_INTERVAL = 5  # Reconnect every 5 seconds if connection is lost
 INFLUX_WRITE_INTERVAL = 5  # Write to InfluxDB every 5 seconds
 
+# Points are batched and written from the client's background thread so the event loop never blocks on HTTP
+# Closing waits at most max_close_wait ms for pending batches, an unreachable InfluxDB must not hold up shutdown
+INFLUX_WRITE_OPTIONS = WriteOptions(batch_size=50, flush_interval=5000, jitter_interval=500, retry_interval=5000, max_close_wait=10_000)
+
+# Line protocol template for one telemetry sample, filled in by write_to_influx()
+# Integer fields carry the "i" suffix, booleans are written as True/False which InfluxDB accepts
+INFLUX_LINE_PROTOCOL = (
+    "smoker_telemetry,sensor=temp_air_top temperature={temp_air_top}i {timestamp}\n"
+    "smoker_telemetry,sensor=temp_air_bottom temperature={temp_air_bottom}i {timestamp}\n"
+    "smoker_telemetry,sensor=temp_meat_1 temperature={temp_meat_1}i {timestamp}\n"
+    "smoker_parameters,target=temp_air temperature={temp_air_target}i {timestamp}\n"
+    "smoker_parameters,target=temp_meat_1 temperature={temp_meat_1_target}i {timestamp}\n"
+    "smoker_state,component=cooking_state active={cooking_state} {timestamp}\n"
+    "smoker_state,component=fan_state active={fan_state} {timestamp}\n"
+    "smoker_state,component=heater_state active={heater_state} {timestamp}\n"
+    "smoker_state,component=smoker_rate rate={smoker_rate}i {timestamp}\n"
+    "smoker_state,component=smoker_state active={smoker_state} {timestamp}"
+)
+
+#######################################################################################################################
+# State
+#######################################################################################################################
+
+class State:
+    """Telemetry, parameters and connection state shared by all functions and tasks"""
+    __slots__ = (
+        # Temperatures
+        'temp_air_top', 'temp_air_bottom', 'temp_air_target', 'temp_meat_1', 'temp_meat_1_target',
+        # States
+        'cooking_state', 'fan_state_reported', 'heater_state', 'heater_state_reported', 'smoker_state', 'smoker_rate',
+        # Communications
+        'serial_connected', 'pico_reader', 'pico_writer', 'last_sent_controls', 'last_controls_sent_time',
+        'influxdb_connected', 'influx_write_client', 'influx_write_api', 'last_influxdb_reconnect_time',
+        # Parameter file tracking
+        'last_saved_params', 'last_params_file_timestamp'
+    )
+
+    def __init__(self):
+        # Temperatures
+        self.temp_air_top        = 100
+        self.temp_air_bottom     = 100
+        self.temp_air_target     = 225
+        self.temp_meat_1         = 100
+        self.temp_meat_1_target  = 190
+
+        # States
+        self.cooking_state         = False
+        self.fan_state_reported    = False
+        self.heater_state          = False
+        self.heater_state_reported = False
+        self.smoker_state          = False
+        self.smoker_rate           = 30
+
+        # Communications
+        self.serial_connected             = False
+        self.pico_reader                  = None
+        self.pico_writer                  = None
+        self.last_sent_controls           = {}  # Last command sent to the Pico for each control
+        self.last_controls_sent_time      = 0
+        self.influxdb_connected           = False
+        self.influx_write_client          = None
+        self.influx_write_api             = None
+        self.last_influxdb_reconnect_time = 0
+
+        # Last saved parameters
+        self.last_saved_params = {
+            "temp_air_target": None,
+            "temp_meat_1_target": None,
+            "cooking_on": None,
+            "smoker_rate": None,
+            "timestamp": None
+        }
+        self.last_params_file_timestamp = 0  # Track last parameter file modification time
+
+
 #######################################################################################################################
 # Functions
 #######################################################################################################################
@@ -94,292 +227,254 @@ logger.info("Defining functions and tasks...")
 
 
 # Heating element control
-def control_heater():
-    global temp_air_top, temp_air_bottom, heater_state, serial_connected
-
-    if not serial_connected:
+def control_heater(state):
+    if not state.serial_connected:
         return  # Skip control if not connected to serial
 
-    if cooking_state:
-        avg_temp = (temp_air_top + temp_air_bottom) / 2
-        if avg_temp < temp_air_target:
-            heater_state = True
-            send_command_to_pico('HEATER_STATE 1\n')
-        else:
-            heater_state = False
-            send_command_to_pico('HEATER_STATE 0\n')
-    else:
-        heater_state = False
-        send_command_to_pico('HEATER_STATE 0\n')
+    # Only decides the heater state, flush_controls() sends it to the Pico
+    # Heat while the average air temperature is below target, compared as a sum to skip the division
+    state.heater_state = state.cooking_state and (state.temp_air_top + state.temp_air_bottom) < 2 * state.temp_air_target
 
 
 #######################################################################################################################
 # Functions for parameter saving and loading
 #######################################################################################################################
 
-def parameters_changed():
+def parameters_changed(state):
     """Check if any parameters have changed since last save"""
-    global temp_air_target, temp_meat_1_target, cooking_state, smoker_rate, last_saved_params
+    last_saved_params = state.last_saved_params
     
     return (
-        last_saved_params["temp_air_target"] != temp_air_target or
-        last_saved_params["temp_meat_1_target"] != temp_meat_1_target or
-        last_saved_params["cooking_on"] != cooking_state or
-        last_saved_params["smoker_rate"] != smoker_rate
+        last_saved_params["temp_air_target"] != state.temp_air_target or
+        last_saved_params["temp_meat_1_target"] != state.temp_meat_1_target or
+        last_saved_params["cooking_on"] != state.cooking_state or
+        last_saved_params["smoker_rate"] != state.smoker_rate
     )
 
-def check_params_file_updated():
+def check_params_file_updated(state):
     """Check if parameters file has been modified by another program like the WebApp"""
-    global last_params_file_timestamp
-    
     try:
         # Get current file modification time
         if os.path.exists(PARAMS_FILE):
             current_timestamp = os.path.getmtime(PARAMS_FILE)
             
             # Check if file has been modified since last check
-            if current_timestamp > last_params_file_timestamp:
-                logger.info(f"Parameters file was modified externally (last: {last_params_file_timestamp}, current: {current_timestamp})")
-                last_params_file_timestamp = current_timestamp
+            if current_timestamp > state.last_params_file_timestamp:
+                logger.info("Parameters file was modified externally (last: %s, current: %s)", state.last_params_file_timestamp, current_timestamp)
+                state.last_params_file_timestamp = current_timestamp
                 return True
         else:
             # If file doesn't exist, update timestamp to current time
-            last_params_file_timestamp = time.time()
+            state.last_params_file_timestamp = time.time()
         
         return False
     except Exception as e:
-        logger.error(f"Error checking parameter file timestamp: {e}")
+        logger.error("Error checking parameter file timestamp: %s", e)
         return False
 
-def save_parameters():
+def save_parameters(state):
     """Save current parameters to JSON file"""
-    global temp_air_target, temp_meat_1_target, cooking_state, smoker_rate, last_saved_params, last_params_file_timestamp
-    
     # Only save if parameters have changed
-    if not parameters_changed():
+    if not parameters_changed(state):
         return
         
     params = {
-        "temp_air_target": temp_air_target,
-        "temp_meat_1_target": temp_meat_1_target,
-        "cooking_on": cooking_state,
-        "smoker_rate": smoker_rate,
+        "temp_air_target": state.temp_air_target,
+        "temp_meat_1_target": state.temp_meat_1_target,
+        "cooking_on": state.cooking_state,
+        "smoker_rate": state.smoker_rate,
         "timestamp": time.time()  # Add current timestamp
     }
     
     try:
-        with open(PARAMS_FILE, 'w') as f:
-            json.dump(params, f)
+        # Write a temporary file and rename it over the old one, so a power loss never leaves a torn file
+        with open(PARAMS_FILE_TMP, 'wb') as f:
+            f.write(json_dumps(params))
+        os.replace(PARAMS_FILE_TMP, PARAMS_FILE)
         # Update last saved parameters
-        last_saved_params = params.copy()
+        state.last_saved_params = params.copy()
         # Update file modification timestamp
-        last_params_file_timestamp = os.path.getmtime(PARAMS_FILE)
+        state.last_params_file_timestamp = os.path.getmtime(PARAMS_FILE)
         logger.info("Parameters saved successfully")
     except Exception as e:
-        logger.error(f"Error saving parameters: {e}")
+        logger.error("Error saving parameters: %s", e)
 
 
-def load_parameters():
+def load_parameters(state):
     """Load parameters from JSON file if it exists and is not older than MAX_PARAM_AGE"""
-    global temp_air_target, temp_meat_1_target, cooking_state, smoker_rate, last_saved_params, last_params_file_timestamp
-    
     try:
-        with open(PARAMS_FILE, 'r') as f:
-            params = json.load(f)
+        with open(PARAMS_FILE, 'rb') as f:
+            params = json_loads(f.read())
             
             # Check if parameters are too old
             saved_timestamp = params.get("timestamp")
             if saved_timestamp is None or (time.time() - saved_timestamp) > MAX_PARAM_AGE:
                 logger.info("Saved parameters are too old or missing timestamp, using defaults")
                 # Initialize last saved parameters with defaults
-                last_saved_params = {
-                    "temp_air_target": temp_air_target,
-                    "temp_meat_1_target": temp_meat_1_target,
-                    "cooking_on": cooking_state,
-                    "smoker_rate": smoker_rate,
+                state.last_saved_params = {
+                    "temp_air_target": state.temp_air_target,
+                    "temp_meat_1_target": state.temp_meat_1_target,
+                    "cooking_on": state.cooking_state,
+                    "smoker_rate": state.smoker_rate,
                     "timestamp": time.time()
                 }
                 return
                 
             # Store previous cooking state to detect changes
-            previous_cooking_state = cooking_state
+            previous_cooking_state = state.cooking_state
             
             # Load parameters if they're not too old
-            temp_air_target = int(params.get("temp_air_target", temp_air_target))
-            temp_meat_1_target = int(params.get("temp_meat_1_target", temp_meat_1_target))
-            cooking_state = bool(params.get("cooking_on", cooking_state))
+            state.temp_air_target = int(params.get("temp_air_target", state.temp_air_target))
+            state.temp_meat_1_target = int(params.get("temp_meat_1_target", state.temp_meat_1_target))
+            state.cooking_state = bool(params.get("cooking_on", state.cooking_state))
             
             # Load smoker rate if available
             if "smoker_rate" in params:
-                smoker_rate = int(params.get("smoker_rate", smoker_rate))
+                state.smoker_rate = int(params.get("smoker_rate", state.smoker_rate))
                 
             # Update last saved parameters
-            last_saved_params = {
-                "temp_air_target": temp_air_target,
-                "temp_meat_1_target": temp_meat_1_target,
-                "cooking_on": cooking_state,
-                "smoker_rate": smoker_rate,
+            state.last_saved_params = {
+                "temp_air_target": state.temp_air_target,
+                "temp_meat_1_target": state.temp_meat_1_target,
+                "cooking_on": state.cooking_state,
+                "smoker_rate": state.smoker_rate,
                 "timestamp": saved_timestamp
             }
             
-            # If cooking state has changed, send immediate update to Pico
-            if previous_cooking_state != cooking_state and serial_connected:
-                cooking_state_cmd = 1 if cooking_state else 0
-                send_command_to_pico(f'COOKING_STATE {cooking_state_cmd}\n')
-                logger.info(f"Sent cooking state update to Pico: {cooking_state}")
+            # A changed cooking state is sent to the Pico by the next flush_controls()
+            if previous_cooking_state != state.cooking_state:
+                logger.info("Cooking state changed to %s", state.cooking_state)
             
         # Update file modification timestamp
-        last_params_file_timestamp = os.path.getmtime(PARAMS_FILE)
+        state.last_params_file_timestamp = os.path.getmtime(PARAMS_FILE)
         logger.info("Parameters loaded successfully")
     except FileNotFoundError:
         logger.info("No saved parameters found, using defaults")
         # Initialize last saved parameters with defaults
-        last_saved_params = {
-            "temp_air_target": temp_air_target,
-            "temp_meat_1_target": temp_meat_1_target,
-            "cooking_on": cooking_state,
-            "smoker_rate": smoker_rate,
+        state.last_saved_params = {
+            "temp_air_target": state.temp_air_target,
+            "temp_meat_1_target": state.temp_meat_1_target,
+            "cooking_on": state.cooking_state,
+            "smoker_rate": state.smoker_rate,
             "timestamp": time.time()
         }
         # Initialize file modification timestamp
-        last_params_file_timestamp = time.time()
+        state.last_params_file_timestamp = time.time()
     except Exception as e:
-        logger.error(f"Error loading parameters: {e}")
+        logger.error("Error loading parameters: %s", e)
         # Initialize last saved parameters with defaults
-        last_saved_params = {
-            "temp_air_target": temp_air_target,
-            "temp_meat_1_target": temp_meat_1_target,
-            "cooking_on": cooking_state,
-            "smoker_rate": smoker_rate,
+        state.last_saved_params = {
+            "temp_air_target": state.temp_air_target,
+            "temp_meat_1_target": state.temp_meat_1_target,
+            "cooking_on": state.cooking_state,
+            "smoker_rate": state.smoker_rate,
             "timestamp": time.time()
         }
         # Initialize file modification timestamp
-        last_params_file_timestamp = time.time()
+        state.last_params_file_timestamp = time.time()
 
 
 #######################################################################################################################
 # Functions for InfluxDB
 #######################################################################################################################
 
-def check_influxdb_connection():
+def check_influxdb_connection(state):
     """Check if InfluxDB connection is active and reconnect if needed"""
-    global influxdb_connected, last_influxdb_reconnect_time, influx_write_client, influx_write_api
-
     # Only attempt reconnection if enough time has passed since last attempt
-    if not influxdb_connected and time.time() - last_influxdb_reconnect_time >= INFLUXDB_RECONNECT_INTERVAL:
+    if not state.influxdb_connected and time.time() - state.last_influxdb_reconnect_time >= INFLUXDB_RECONNECT_INTERVAL:
         try:
             # Try a ping or health check to see if connection is active
-            health = influx_write_client.health()
+            health = state.influx_write_client.health()
             if health.status == "pass":
-                influxdb_connected = True
+                state.influxdb_connected = True
                 logger.info("InfluxDB connection is healthy")
             else:
-                logger.error(f"InfluxDB health check failed: {health.message}")
-                try_reconnect_influxdb()
+                logger.error("InfluxDB health check failed: %s", health.message)
+                try_reconnect_influxdb(state)
         except Exception as e:
-            logger.error(f"Error checking InfluxDB connection: {e}")
-            try_reconnect_influxdb()
+            logger.error("Error checking InfluxDB connection: %s", e)
+            try_reconnect_influxdb(state)
 
 
-def try_reconnect_influxdb():
+def try_reconnect_influxdb(state):
     """Try to reconnect to InfluxDB"""
-    global influxdb_connected, last_influxdb_reconnect_time, influx_write_client, influx_write_api
-    
-    last_influxdb_reconnect_time = time.time()
+    state.last_influxdb_reconnect_time = time.time()
     
     try:
         logger.info("Attempting to reconnect to InfluxDB...")
+        # Close the existing write API first so its pending batches stop retrying in the background
+        if state.influx_write_api is not None:
+            try:
+                state.influx_write_api.close()
+            except:
+                pass
+            state.influx_write_api = None
+
         # Close existing client if any
-        if influx_write_client is not None:
+        if state.influx_write_client is not None:
             try:
-                influx_write_client.close()
+                state.influx_write_client.close()
             except:
                 pass
         
         # Create a new client
-        influx_write_client = influxdb_client.InfluxDBClient(
-            url=Smoker_Secrets.INFLUX_URL, 
-            token=Smoker_Secrets.INFLUX_TOKEN, 
-            org=Smoker_Secrets.INFLUX_ORG
+        state.influx_write_client = influxdb_client.InfluxDBClient(
+            url=INFLUX_URL, 
+            token=INFLUX_TOKEN, 
+            org=INFLUX_ORG
         )
         
         # Create a new write API
-        influx_write_api = influx_write_client.write_api(write_options=SYNCHRONOUS)
+        state.influx_write_api = state.influx_write_client.write_api(write_options=INFLUX_WRITE_OPTIONS, error_callback=functools.partial(on_influx_write_error, state))
         
         # Test the connection with a health check
-        health = influx_write_client.health()
+        health = state.influx_write_client.health()
         if health.status == "pass":
-            influxdb_connected = True
+            state.influxdb_connected = True
             logger.info("Successfully reconnected to InfluxDB")
         else:
-            influxdb_connected = False
-            logger.error(f"Failed to reconnect to InfluxDB: {health.message}")
+            state.influxdb_connected = False
+            logger.error("Failed to reconnect to InfluxDB: %s", health.message)
     except Exception as e:
-        influxdb_connected = False
-        logger.error(f"Failed to reconnect to InfluxDB: {e}")
+        state.influxdb_connected = False
+        logger.error("Failed to reconnect to InfluxDB: %s", e)
+
 
+def on_influx_write_error(state, conf, data, exception):
+    """Called from the batching thread when a batch could not be written after all retries"""
+    logger.error("Error writing batch to InfluxDB: %s", exception)
+    # Mark as disconnected so we can try to reconnect
+    state.influxdb_connected = False
 
-def write_to_influx():
-    global temp_air_top, temp_air_bottom, temp_meat_1, temp_air_target, temp_meat_1_target, cooking_state, fan_state_reported, heater_state_reported, influxdb_connected
 
+def write_to_influx(state):
     # Skip if not connected to InfluxDB
-    if not influxdb_connected:
+    if not state.influxdb_connected:
         logger.warning("Skipping write to InfluxDB as connection is not available")
         return
 
-    # Create points for each measurement with explicit timezone and integer conversion
-    points = [
-        Point("smoker_telemetry")
-            .tag("sensor", "temp_air_top")
-            .field("temperature", int(temp_air_top))
-            .time(datetime.now(timezone.utc)),
-        Point("smoker_telemetry")
-            .tag("sensor", "temp_air_bottom")
-            .field("temperature", int(temp_air_bottom))
-            .time(datetime.now(timezone.utc)),
-        Point("smoker_telemetry")
-            .tag("sensor", "temp_meat_1")
-            .field("temperature", int(temp_meat_1))
-            .time(datetime.now(timezone.utc)),
-        Point("smoker_parameters")
-            .tag("target", "temp_air")
-            .field("temperature", int(temp_air_target))
-            .time(datetime.now(timezone.utc)),
-        Point("smoker_parameters")
-            .tag("target", "temp_meat_1")
-            .field("temperature", int(temp_meat_1_target))
-            .time(datetime.now(timezone.utc)),
-        Point("smoker_state")
-            .tag("component", "cooking_state")
-            .field("active", bool(cooking_state))
-            .time(datetime.now(timezone.utc)),
-        Point("smoker_state")
-            .tag("component", "fan_state")
-            .field("active", bool(fan_state_reported))
-            .time(datetime.now(timezone.utc)),
-        Point("smoker_state")
-            .tag("component", "heater_state")
-            .field("active", bool(heater_state_reported))
-            .time(datetime.now(timezone.utc)),
-        Point("smoker_state")
-            .tag("component", "smoker_rate")
-            .field("rate", int(smoker_rate))
-            .time(datetime.now(timezone.utc)),
-        Point("smoker_state")
-            .tag("component", "smoker_state")
-            .field("active", bool(smoker_state))
-            .time(datetime.now(timezone.utc))
-    ]
+    # Fill in one line protocol sample, all lines share the same nanosecond timestamp
+    record = INFLUX_LINE_PROTOCOL.format(
+        timestamp=time.time_ns(),
+        temp_air_top=int(state.temp_air_top),
+        temp_air_bottom=int(state.temp_air_bottom),
+        temp_meat_1=int(state.temp_meat_1),
+        temp_air_target=int(state.temp_air_target),
+        temp_meat_1_target=int(state.temp_meat_1_target),
+        cooking_state=bool(state.cooking_state),
+        fan_state=bool(state.fan_state_reported),
+        heater_state=bool(state.heater_state_reported),
+        smoker_rate=int(state.smoker_rate),
+        smoker_state=bool(state.smoker_state)
+    )
 
     try:
-        # Write all points to InfluxDB
-        influx_write_api.write(bucket=Smoker_Secrets.INFLUX_BUCKET, org=Smoker_Secrets.INFLUX_ORG, record=points)
-        # If write succeeds, ensure connected status is true
-        influxdb_connected = True
+        # Queue the sample for the background batch writer
+        state.influx_write_api.write(bucket=INFLUX_BUCKET, org=INFLUX_ORG, record=record)
     except Exception as e:
-        logger.error(f"Error writing to InfluxDB: {e}")
+        logger.error("Error writing to InfluxDB: %s", e)
         # Mark as disconnected so we can try to reconnect
-        influxdb_connected = False
+        state.influxdb_connected = False
 
 
 #######################################################################################################################
@@ -387,120 +482,132 @@ def write_to_influx():
 #######################################################################################################################
 
 # Define function to try to reconnect to serial port
-def try_reconnect_serial():
-    global pico_serial, serial_connected
+async def try_reconnect_serial(state):
     try:
-        if 'pico_serial' in globals() and pico_serial:
+        if state.pico_writer is not None:
             try:
-                pico_serial.close()
+                state.pico_writer.close()
             except:
                 pass
         
-        logger.info(f"Attempting to reconnect to Pi Pico on {SERIAL_PORT}...")
-        pico_serial = serial.Serial(
-            port=SERIAL_PORT,
-            baudrate=SERIAL_BAUD,
-            timeout=2.0
+        logger.info("Attempting to reconnect to Pi Pico on %s...", SERIAL_PORT)
+        state.pico_reader, state.pico_writer = await serial_asyncio.open_serial_connection(
+            url=SERIAL_PORT,
+            baudrate=SERIAL_BAUD
         )
-        serial_connected = True
-        logger.info(f"Successfully reconnected to Pi Pico on {SERIAL_PORT}")
+        enable_serial_low_latency(state.pico_writer.transport.serial)
+        # Resend every control command so the Pico is back in sync after the reconnect
+        state.last_sent_controls.clear()
+        state.serial_connected = True
+        logger.info("Successfully reconnected to Pi Pico on %s", SERIAL_PORT)
     except Exception as e:
-        logger.error(f"Failed to reconnect to Pi Pico: {e}")
-        serial_connected = False
+        logger.error("Failed to reconnect to Pi Pico: %s", e)
+        state.serial_connected = False
 
 
-def send_command_to_pico(command):
-    global serial_connected, pico_serial
-    
-    if not serial_connected:
-        logger.error(f'send_command_to_pico: Serial not connected')
+def enable_serial_low_latency(port):
+    """Ask the tty driver to hand over received bytes immediately instead of batching them"""
+    try:
+        # Sets ASYNC_LOW_LATENCY through the TIOCGSERIAL/TIOCSSERIAL ioctls
+        port.set_low_latency_mode(True)
+        logger.info("Enabled low latency mode on %s", SERIAL_PORT)
+    except Exception as e:
+        # Not every USB serial driver supports it, the port still works without
+        logger.warning("Could not enable low latency mode on %s: %s", SERIAL_PORT, e)
+
+
+def send_command_to_pico(state, command):
+    if not state.serial_connected:
+        logger.error('send_command_to_pico: Serial not connected')
         return
         
     try:
-        pico_serial.write(command.encode())
+        # Queued on the transport, flushed to the port by the event loop
+        state.pico_writer.write(command if isinstance(command, bytes) else command.encode())
     except Exception as e:
-        logger.error(f"Serial communication error: {e}")
-        serial_connected = False  # Mark as disconnected so we can try to reconnect later
+        logger.error("Serial communication error: %s", e)
+        state.serial_connected = False  # Mark as disconnected so we can try to reconnect later
 
 
-def read_pico_serial():
-    global fan_state_reported, heater_state, serial_connected, heater_state_reported
-    global temp_air_top, temp_air_bottom, temp_meat_1, smoker_rate, smoker_state
-    
-    if not serial_connected:
-        logger.error(f'Serial not connected')
+async def drain_pico_commands(state):
+    """Wait for queued commands to be handed to the serial port"""
+    if not state.serial_connected:
         return
-    
+
     try:
-        if pico_serial.in_waiting > 0:
-            line = pico_serial.readline().decode('utf-8').rstrip()
-            logger.debug(f'Pico serial: {line}')
-            if line.startswith('{'):
-                try:
-                    data = json.loads(line)
-
-                    if 'temp_air_top' in data:
-                        temp_air_top = data['temp_air_top']
-                    if 'temp_air_bottom' in data:
-                        temp_air_bottom = data['temp_air_bottom']
-                    if 'temp_meat' in data:
-                        temp_meat_1 = data['temp_meat']
-                    if 'heater_state' in data:
-                        if data['heater_state'] == 'ON':
-                            heater_state_reported = True
-                        else:
-                            heater_state_reported = False
-                    if 'fan_state' in data:
-                        if data['fan_state'] == 'ON':
-                            fan_state_reported = True
-                        else:
-                            fan_state_reported = False
-                    if 'smoker_state' in data:
-                        if data['smoker_state'] == 'ON':
-                            smoker_state = True
-                        else:
-                            smoker_state = False
-                    if 'smoker_rate' in data:
-                        smoker_rate = data['smoker_rate']
-                except json.JSONDecodeError as e:
-                    logger.error(f"JSON decode error: {e} in line: {line}")
+        await state.pico_writer.drain()
     except Exception as e:
-        logger.error(f"Error reading from serial: {e}")
-        serial_connected = False
+        logger.error("Serial communication error: %s", e)
+        state.serial_connected = False
 
 
-def deal_with_pico_comms():
-    global serial_connected, last_pico_reconnect_time
-    
-    # Attempt to reconnect to serial if disconnected
-    if not serial_connected and time.time() - last_pico_reconnect_time >= PICO_RECONNECT_INTERVAL:
-        try_reconnect_serial()
-        last_pico_reconnect_time = time.time()
-        logger.debug(f'Reconnected to Pi Pico on {SERIAL_PORT}')
+async def read_pico_serial(state):
+    if not state.serial_connected:
+        logger.error('Serial not connected')
+        return
     
-    read_pico_serial()
+    try:
+        # Suspends until the kernel reports data on the port, no polling needed
+        line = await state.pico_reader.readline()
+        if not line:
+            logger.error("Serial connection to Pi Pico closed")
+            state.serial_connected = False
+            return
+        # Parsed as bytes, the JSON decoder handles the UTF-8 itself
+        line = line.rstrip()
+        logger.debug('Pico serial: %s', line)
+        if line.startswith(b'{'):
+            try:
+                if PICO_FRAME_DECODER is not None:
+                    frame = PICO_FRAME_DECODER.decode(line)
+
+                    # Update the state attribute mapped to each field the Pico reported
+                    for key, (name, convert) in PICO_FIELD_HANDLERS.items():
+                        value = getattr(frame, key)
+                        if value is not None:
+                            setattr(state, name, value if convert is None else convert(value))
+                else:
+                    data = json_loads(line)
+
+                    # Update the state attribute mapped to each key the Pico reported
+                    for key, value in data.items():
+                        handler = PICO_FIELD_HANDLERS.get(key)
+                        if handler is not None:
+                            name, convert = handler
+                            setattr(state, name, value if convert is None else convert(value))
+            except PICO_DECODE_ERRORS as e:
+                logger.error("JSON decode error: %s in line: %s", e, line)
+    except Exception as e:
+        logger.error("Error reading from serial: %s", e)
+        state.serial_connected = False
 
 
-# Control smoker rate
-def control_smoker():
-    global smoker_rate, serial_connected
-    
-    if not serial_connected:
+# Send heater state, smoker rate and cooking state to the Pico
+def flush_controls(state):
+    if not state.serial_connected:
         return  # Skip control if not connected to serial
 
-    send_command_to_pico(f'SMOKER_RATE {smoker_rate}\n')
+    # The Pico stops cooking when COOKING_STATE messages stop arriving, so resend everything now and then
+    current_time = time.time()
+    if current_time - state.last_controls_sent_time >= CONTROL_RESEND_INTERVAL:
+        state.last_sent_controls.clear()
+        state.last_controls_sent_time = current_time
 
+    controls = {
+        'heater': CMD_HEATER_ON if state.heater_state else CMD_HEATER_OFF,
+        'smoker': b'SMOKER_RATE %d\n' % state.smoker_rate,
+        'cooking': CMD_COOKING_ON if state.cooking_state else CMD_COOKING_OFF
+    }
+    # Only commands whose value changed since they were last sent
+    command = b''.join(cmd for name, cmd in controls.items() if state.last_sent_controls.get(name) != cmd)
+    if not command:
+        return
 
-# Control cooking state
-def control_cooking_state():
-    global cooking_state, serial_connected
-    
-    if not serial_connected:
-        return  # Skip control if not connected to serial
-    
-    cooking_state_cmd = 1 if cooking_state else 0
-    send_command_to_pico(f'COOKING_STATE {cooking_state_cmd}\n')
-    logger.debug(f'Sent cooking state {cooking_state} to Pico')
+    # All commands go out in a single write, so the Pico receives them in one USB transfer
+    send_command_to_pico(state, command)
+    if state.serial_connected:
+        state.last_sent_controls.update(controls)
+    logger.debug('Sent heater state %s, smoker rate %s and cooking state %s to Pico', state.heater_state, state.smoker_rate, state.cooking_state)
 
 
 #######################################################################################################################
@@ -508,28 +615,7 @@ def control_cooking_state():
 #######################################################################################################################
 logger.info("Defining variables...")
 
-# Temperatures
-temp_air_top        = 100
-temp_air_bottom     = 100
-temp_air_target     = 225
-temp_meat_1         = 100
-temp_meat_1_target  = 190
-
-# Communications
-serial_connected             = False
-wifi_connected               = False
-last_pico_reconnect_time     = 0
-influxdb_connected           = False
-last_influxdb_reconnect_time = 0
-last_params_file_timestamp   = 0  # Track last parameter file modification time
-
-# States
-cooking_state         = False
-fan_state_reported    = False
-heater_state          = False
-heater_state_reported = False
-smoker_state          = False
-smoker_rate           = 30
+state = State()
 
 #######################################################################################################################
 # Initialization
@@ -537,38 +623,122 @@ smoker_rate           = 30
 logger.info("Initializing...")
 
 # Load saved parameters
-load_parameters()
+load_parameters(state)
 
 try:
     # Initialize InfluxDB client
-    influx_write_client = influxdb_client.InfluxDBClient(url=Smoker_Secrets.INFLUX_URL, token=Smoker_Secrets.INFLUX_TOKEN, org=Smoker_Secrets.INFLUX_ORG)
-    influx_write_api = influx_write_client.write_api(write_options=SYNCHRONOUS)
+    state.influx_write_client = influxdb_client.InfluxDBClient(url=INFLUX_URL, token=INFLUX_TOKEN, org=INFLUX_ORG)
+    state.influx_write_api = state.influx_write_client.write_api(write_options=INFLUX_WRITE_OPTIONS, error_callback=functools.partial(on_influx_write_error, state))
     
     # Check the initial connection
-    health = influx_write_client.health()
+    health = state.influx_write_client.health()
     if health.status == "pass":
-        influxdb_connected = True
+        state.influxdb_connected = True
         logger.info("Connected to InfluxDB successfully")
     else:
-        influxdb_connected = False
-        logger.error(f"InfluxDB health check failed during initialization: {health.message}")
+        state.influxdb_connected = False
+        logger.error("InfluxDB health check failed during initialization: %s", health.message)
 except Exception as e:
-    influxdb_connected = False
-    logger.error(f"Failed to initialize InfluxDB connection: {e}")
+    state.influxdb_connected = False
+    logger.error("Failed to initialize InfluxDB connection: %s", e)
 
 
-# Serial communication
-try:
-    pico_serial = serial.Serial(
-        port=SERIAL_PORT,
-        baudrate=SERIAL_BAUD,
-        timeout=1.0  # 1 second timeout
-    )
-    serial_connected = True
-    logger.info(f"Connected to Pi Pico on {SERIAL_PORT}")
-except Exception as e:
-    logger.error(f"Failed to connect to Pi Pico: {e}")
-    serial_connected = False
+#######################################################################################################################
+# Tasks
+#######################################################################################################################
+logger.info("Defining tasks...")
+
+
+async def pico_serial_task(state):
+    """Keep the Pico connection open and process every line it sends"""
+    while True:
+        if not state.serial_connected:
+            await try_reconnect_serial(state)
+            if not state.serial_connected:
+                await asyncio.sleep(PICO_RECONNECT_INTERVAL)
+            continue
+
+        await read_pico_serial(state)
+
+
+async def control_task(state):
+    """Send control commands to the Pico every second"""
+    while True:
+        await asyncio.sleep(1)
+        control_heater(state)
+        flush_controls(state)
+        await drain_pico_commands(state)
+        logger.debug('Temp air top: %s, Temp air bottom: %s, Temp meat 1: %s, heater_state: %s, fan_state: %s, smoker_rate: %s', state.temp_air_top, state.temp_air_bottom, state.temp_meat_1, state.heater_state, state.fan_state_reported, state.smoker_rate)
+
+
+async def reload_parameters(state):
+    """Load parameters written by another program and apply them immediately"""
+    logger.info("Parameter file was modified externally, loading new parameters")
+    load_parameters(state)
+    # Update control components with new parameters immediately
+    control_heater(state)
+    flush_controls(state)
+    await drain_pico_commands(state)
+
+
+async def poll_params_file(state):
+    """Check if parameters file has been modified by web app (every second)"""
+    while True:
+        await asyncio.sleep(1)
+        if check_params_file_updated(state):
+            await reload_parameters(state)
+
+
+async def watch_params_file(state):
+    """Wait for the kernel to report writes to the parameters file"""
+    params_dir, params_name = os.path.split(PARAMS_FILE)
+    with Inotify() as inotify:
+        # Watch the directory so files replaced by a rename are picked up too
+        inotify.add_watch(params_dir, Mask.CLOSE_WRITE | Mask.MOVED_TO)
+        logger.info("Watching %s for parameter file changes", params_dir)
+        async for event in inotify:
+            # The timestamp check skips events caused by our own save_parameters()
+            if str(event.name) == params_name and check_params_file_updated(state):
+                await reload_parameters(state)
+
+
+async def params_file_task(state):
+    """Reload parameters whenever the web app modifies the parameters file"""
+    if Inotify is not None:
+        try:
+            await watch_params_file(state)
+        except OSError as e:
+            logger.warning("Unable to watch parameters file, falling back to polling: %s", e)
+    else:
+        logger.warning("asyncinotify not available, polling parameters file for changes")
+
+    await poll_params_file(state)
+
+
+async def influx_task(state):
+    """Write telemetry to InfluxDB"""
+    while True:
+        await asyncio.sleep(INFLUX_WRITE_INTERVAL)
+        write_to_influx(state)
+        logger.debug('Wrote data to InfluxDB. Connection status: %s', state.influxdb_connected)
+
+
+async def influx_health_task(state):
+    """Reconnect to InfluxDB after a failure without blocking the event loop"""
+    while True:
+        await asyncio.sleep(INFLUXDB_RECONNECT_INTERVAL)
+        if not state.influxdb_connected:
+            # Health checks and reconnects are blocking HTTP calls, run them in a worker thread
+            await asyncio.to_thread(check_influxdb_connection, state)
+
+
+async def save_parameters_task(state):
+    """Save parameters for power failure recovery"""
+    while True:
+        await asyncio.sleep(SAVE_INTERVAL)
+        save_parameters(state)
+        logger.debug('Saved parameters')
+
 
 #######################################################################################################################
 # Main Loop
@@ -576,63 +746,39 @@ except Exception as e:
 logger.info("Starting main loop...")
 
 
-def main():
+async def main_loop(state):
     try:
-        # Timers
-        last_update_time = time.time()
-        last_save_time = time.time()
-        last_influx_write_time = time.time()
-        last_params_check_time = time.time()
-
-        running = True
-        while running:
-            current_time = time.time()
-            
-            deal_with_pico_comms()
-            check_influxdb_connection()
-
-            # 1 second tasks
-            if current_time - last_update_time >= 1:
-                control_heater()
-                control_smoker()
-                control_cooking_state()
-                last_update_time = current_time
-                logger.debug(f'Temp air top: {temp_air_top}, Temp air bottom: {temp_air_bottom}, Temp meat 1: {temp_meat_1}, heater_state: {heater_state}, fan_state: {fan_state_reported}, smoker_rate: {smoker_rate}')
-
-            # Check if parameters file has been modified by web app (every second)
-            if current_time - last_params_check_time >= 1:
-                if check_params_file_updated():
-                    logger.info("Parameter file was modified externally, loading new parameters")
-                    load_parameters()
-                    # Update control components with new parameters immediately
-                    control_heater()
-                    control_smoker()
-                    control_cooking_state()
-                last_params_check_time = current_time
-
-            # InfluxDB writes
-            if current_time - last_influx_write_time >= INFLUX_WRITE_INTERVAL:
-                write_to_influx()
-                last_influx_write_time = current_time
-                logger.debug(f'Wrote data to InfluxDB. Connection status: {influxdb_connected}')
-
-            if time.time() - last_save_time >= SAVE_INTERVAL:
-                save_parameters()
-                last_save_time = current_time
-                logger.debug(f'Saved parameters')
-
-            time.sleep(0.03)
+        await asyncio.gather(
+            pico_serial_task(state),
+            control_task(state),
+            params_file_task(state),
+            influx_task(state),
+            influx_health_task(state),
+            save_parameters_task(state)
+        )
+    finally:
+        if state.pico_writer is not None:
+            try:
+                state.pico_writer.close()
+            except:
+                pass
+
 
+def main():
+    try:
+        asyncio.run(main_loop(state))
     except KeyboardInterrupt:
         logger.info("Keyboard interrupt")
     except Exception as e:
-        logger.error(f"Error: {e}")
+        logger.error("Error: %s", e)
     finally:
         logger.info("Exiting...")
-        
-        if serial_connected:
+
+        if state.influx_write_api is not None:
             try:
-                pico_serial.close()
+                # Closing the write API flushes any batched points
+                state.influx_write_api.close()
+                state.influx_write_client.close()
             except:
                 pass
         sys.exit()
@@ -1,9 +1,10 @@
+import os
+
 # InfluxDB Configuration
 INFLUX_HOST = "localhost"
 INFLUX_PORT = 8086
-INFLUX_URL = f"http://{INFLUX_HOST}:{INFLUX_PORT}"
+INFLUX_URL = os.environ.get("INFLUX_URL", f"http://{INFLUX_HOST}:{INFLUX_PORT}")
 INFLUX_ORG = "opensmoker"
 INFLUX_BUCKET = "opensmoker_mqtt_data"
-INFLUX_TOKEN="DAvOyR2iJzwWNSPNrNHqntO4c0HIB26M1hotqgTuYuQLEbIAGAyU7Gszol086GcDO2E5kURgnpE67n5cFv1Lmw=="
-
-
+# API token is never stored in the repo, set INFLUX_TOKEN in the environment of both scripts
+INFLUX_TOKEN = os.environ["INFLUX_TOKEN"]
@@ -1,21 +1,21 @@
 #!/bin/python3
 
-from flask import Flask, render_template, request, Response, jsonify
-import json
+from flask import Flask, render_template, request, Response
+import orjson
 import sys
 import os
 import time
-from datetime import datetime, timezone
+import threading
+import atexit
+import functools
+from string import Template
+from cachetools import TTLCache
 # Add the parent directory to path to import smoker_secrets
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from datetime import datetime, timedelta
 import Smoker_Secrets
 
 # InfluxDB client
-from influxdb_client import InfluxDBClient
-from influxdb_client.client.flux_table import FluxStructureEncoder
-from influxdb_client import Point   
-from influxdb_client.client.write_api import SYNCHRONOUS
+from influxdb_client import InfluxDBClient, Dialect
 
 app = Flask(__name__)
 
@@ -25,20 +25,268 @@ INFLUX_TOKEN = Smoker_Secrets.INFLUX_TOKEN
 INFLUX_ORG = Smoker_Secrets.INFLUX_ORG
 INFLUX_BUCKET = Smoker_Secrets.INFLUX_BUCKET
 
+# Initialize InfluxDB client once, so every request reuses its pooled keep-alive connections
+# Query responses are gzip compressed on the wire, telemetry rows compress very well
+client = InfluxDBClient(
+    url=INFLUX_URL,
+    token=INFLUX_TOKEN,
+    org=INFLUX_ORG,
+    enable_gzip=True
+)
+query_api = client.query_api()
+
+# Query results as plain CSV, a header row per table and no annotation rows
+CSV_DIALECT = Dialect(header=True, annotations=[], date_time_format="RFC3339")
+
 # Parameters file path - same as defined in OpenSmoker.py
 PARAMS_FILE = "/home/user/OpenSmoker_Parameters.json"
+PARAMS_FILE_TMP = PARAMS_FILE + ".webapp.tmp"  # Written first, then renamed over PARAMS_FILE
+
+PARAMS_SNAPSHOT_INTERVAL = 2  # Write changed parameters to the file at most every 2 seconds
+
+# Parameters are kept in memory, re-read when OpenSmoker.py changes the file and written back by a snapshot thread
+# "dirty" marks changes that have not been written to the file yet
+params_cache = {"mtime": None, "data": {}, "dirty": False}
+# Guards the parameters between request threads and the snapshot thread
+params_lock = threading.Lock()
 
 temp_air_target = 250
 temp_meat_target = 205
 
+# Time ranges offered by the dashboard, anything else falls back to the default instead of reaching Flux
+ALLOWED_RANGES = {"-15m", "-1h", "-3h", "-6h", "-12h", "-24h"}
+DEFAULT_RANGE = "-6h"
+
+# Chart downsampling, long ranges are averaged in InfluxDB down to about this many points per series
+MAX_CHART_POINTS = 1000
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# Chart responses are reused for a few seconds, the dashboard polls far more often than the data changes
+RESPONSE_CACHE_TTL = 5
+STATUS_CACHE_TTL = 1
+response_cache = TTLCache(maxsize=128, ttl=RESPONSE_CACHE_TTL)
+status_cache = TTLCache(maxsize=1, ttl=STATUS_CACHE_TTL)
+# Lets a single request refresh the status while others wait for its result
+status_refresh_lock = threading.Lock()
+# TTLCache is not thread safe, guards both caches between request threads
+cache_lock = threading.Lock()
+
+# Every series returned by /api/data/all, series missing from the query result are sent as empty lists
+DASHBOARD_SERIES = (
+    "temp_air_top", "temp_air_bottom", "temp_meat_1", "temp_air_target", "temp_meat_target",
+    "cooking", "fan", "heater", "smoker_rate"
+)
+# Series returned by /api/data/component-state
+COMPONENT_SERIES = ("cooking", "fan", "heater", "smoker_rate")
+# Streamed responses are sent in pieces of about this many bytes
+STREAM_CHUNK_SIZE = 16 * 1024
+
+
+# Serialize a response body with orjson, it handles the datetimes from InfluxDB natively
+def json_response(data, status=200):
+    return Response(orjson.dumps(data), status=status, mimetype='application/json')
+
+# Empty chart data after a failed query, keeps the UI working but is marked so it is never cached
+def failed_query_response(data):
+    response = json_response(data)
+    response.cache_control.no_store = True
+    return response
+
+# Get the requested chart time range, limited to the ranges the dashboard offers
+def get_from_time():
+    from_time = request.args.get('from', DEFAULT_RANGE)
+    if from_time not in ALLOWED_RANGES:
+        return DEFAULT_RANGE
+    return from_time
+
+# Cache a view's JSON body by path and time range, hits skip both the query and the serialization
+# With a refresh_lock only one request runs the view on a miss, concurrent requests wait and reuse its result
+# A failed result is shared too, it stays cached for the cache's TTL so waiters never repeat a query a peer saw fail
+def cache_json(cache, max_age, refresh_lock=None):
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper():
+            key = (request.path, get_from_time())
+            # Hits never wait for a refresh in progress
+            response = cached_response(cache, key)
+            if response is None:
+                if refresh_lock is None:
+                    response = cached_view(view, cache, key)
+                else:
+                    with refresh_lock:
+                        # The request that held the lock may have just refreshed the entry
+                        response = cached_response(cache, key)
+                        if response is None:
+                            response = cached_view(view, cache, key, cache_errors=True)
+            # Only successful responses may be reused by the browser
+            # A stream's headers go out before its query has finished, so a streamed body is never known to be complete here
+            if response.is_streamed:
+                response.headers['Cache-Control'] = "no-cache"
+            elif response.status_code == 200 and not response.cache_control.no_store:
+                response.headers['Cache-Control'] = f"max-age={max_age}"
+            return response
+        return wrapper
+    return decorator
+
+# Rebuild a response from the cache, None on a miss
+def cached_response(cache, key):
+    with cache_lock:
+        entry = cache.get(key)
+    if entry is None:
+        return None
+    body, status = entry
+    return Response(body, status=status, mimetype='application/json')
+
+# Run the view and cache its body and status
+# Errors are only cached with cache_errors, failed chart queries marked no-store never are
+def cached_view(view, cache, key, cache_errors=False):
+    response = view()
+    if response.cache_control.no_store or (response.status_code != 200 and not cache_errors):
+        return response
+    if response.is_streamed:
+        response.response = cache_stream(cache, key, response.response, response.status_code)
+    else:
+        with cache_lock:
+            cache[key] = (response.get_data(), response.status_code)
+    return response
+
+# Pass a streamed body through and cache it once it has been sent completely
+# The cached copy is the whole body in memory, so a cached range costs its full size until it expires
+# A stream that reports its query failed is passed through but not cached
+def cache_stream(cache, key, chunks, status):
+    body = []
+    chunks = iter(chunks)
+    while True:
+        try:
+            chunk = next(chunks)
+        except StopIteration as done:
+            complete = done.value is not False
+            break
+        body.append(chunk)
+        yield chunk
+    if complete:
+        with cache_lock:
+            cache[key] = (b''.join(body), status)
+
+# Stream query results as one JSON object of series name to points, without building the lists in memory
+# InfluxDB returns each series as one table, so the points of a series arrive one after another
+# Rows are gathered in a buffer and sent in STREAM_CHUNK_SIZE pieces, every yielded chunk is its own write to the client
+# Returns False when the query failed, so cache_stream does not keep the partial body
+def stream_series(query, series_names=DASHBOARD_SERIES):
+    buffer = bytearray(b'{')
+    sent = []
+    complete = True
+    try:
+        # Plain CSV rows are read by column position, the epoch millisecond and value text is copied into the JSON as is
+        time_index = series_index = value_index = None
+        for row in query_api.query_csv(query=query, dialect=CSV_DIALECT):
+            if not row:
+                continue  # Blank line between tables
+            if 'series' in row:
+                # Header row, repeated when the columns change
+                time_index, series_index, value_index = row.index('t'), row.index('series'), row.index('v')
+                continue
+            if time_index is None:
+                continue
+            series = row[series_index]
+            if not sent or sent[-1] != series:
+                # Close the previous series and open the next one
+                if sent:
+                    buffer += b'],'
+                buffer += orjson.dumps(series) + b':['
+                sent.append(series)
+            else:
+                buffer += b','
+            buffer += ('{"t":%s,"v":%s}' % (row[time_index], row[value_index])).encode()
+            if len(buffer) >= STREAM_CHUNK_SIZE:
+                yield bytes(buffer)
+                buffer.clear()
+    except Exception as e:
+        # Log the error but finish the JSON with what was sent so far to prevent UI from breaking
+        print(f"Error querying dashboard data: {str(e)}")
+        complete = False
+    if sent:
+        buffer += b']'
+    for series in series_names:
+        if series not in sent:
+            if sent:
+                buffer += b','
+            buffer += orjson.dumps(series) + b':[]'
+            sent.append(series)
+    buffer += b'}'
+    yield bytes(buffer)
+    return complete
+
+# Pick an aggregateWindow period that keeps a relative range like "-6h" to about MAX_CHART_POINTS points
+# Only the ranges in ALLOWED_RANGES reach here, so the range always parses
+def get_aggregate_window(from_time):
+    duration_seconds = int(from_time[1:-1]) * DURATION_UNITS[from_time[-1]]
+    return f"{max(duration_seconds // MAX_CHART_POINTS, 1)}s"
+
+# Fill in a Flux query template for one time range, the bucket is already in the template from import
+# Only the allowed ranges reach here, so every template's text is built once per range and then reused
+@functools.lru_cache(maxsize=64)
+def build_query(template, from_time):
+    return template.substitute(start=from_time, every=get_aggregate_window(from_time))
+
+
+# Pick up changes OpenSmoker.py made to the parameters file, the caller holds params_lock
+# Raises FileNotFoundError if the smoker has not written the file yet
+def refresh_params():
+    # Changes not yet written win over the file
+    if params_cache["dirty"]:
+        return
+    mtime = os.stat(PARAMS_FILE).st_mtime_ns
+    if mtime != params_cache["mtime"]:
+        with open(PARAMS_FILE, 'rb') as f:
+            params_cache["data"] = orjson.loads(f.read())
+        params_cache["mtime"] = mtime
+
+# Get the current parameters, raises FileNotFoundError if there are none yet
+def load_params():
+    with params_lock:
+        refresh_params()
+        # Callers get their own copy
+        return dict(params_cache["data"])
+
+# Write the parameters file atomically, OpenSmoker.py never sees a partially written file
+# The caller holds params_lock
+def save_params():
+    with open(PARAMS_FILE_TMP, 'wb') as f:
+        f.write(orjson.dumps(params_cache["data"]))
+    os.replace(PARAMS_FILE_TMP, PARAMS_FILE)
+    params_cache["mtime"] = os.stat(PARAMS_FILE).st_mtime_ns
+    params_cache["dirty"] = False
+
+# Set one parameter and timestamp the change so OpenSmoker.py picks it up with the next snapshot
+def update_params(key, value):
+    with params_lock:
+        try:
+            refresh_params()
+        except FileNotFoundError:
+            pass
+        params_cache["data"][key] = value
+        params_cache["data"]['timestamp'] = time.time()
+        params_cache["dirty"] = True
+
+# Write pending parameter changes to the file
+def flush_params():
+    with params_lock:
+        if params_cache["dirty"]:
+            try:
+                save_params()
+            except Exception as e:
+                print(f"Error saving parameters: {str(e)}")
+
+# Snapshot thread, batches bursts of changes like slider drags into one file write
+def snapshot_params():
+    while True:
+        time.sleep(PARAMS_SNAPSHOT_INTERVAL)
+        flush_params()
 
-# Initialize InfluxDB client
-def get_influxdb_client():
-    return InfluxDBClient(
-        url=INFLUX_URL,
-        token=INFLUX_TOKEN,
-        org=INFLUX_ORG
-    )
+threading.Thread(target=snapshot_params, daemon=True).start()
+# Do not lose the last changes when the server shuts down
+atexit.register(flush_params)
 
 @app.route('/')
 def index():
@@ -48,21 +296,17 @@ def index():
 @app.route('/api/parameters', methods=['GET'])
 def get_parameters():
     try:
-        # Check if parameters file exists
-        if os.path.exists(PARAMS_FILE):
-            with open(PARAMS_FILE, 'r') as f:
-                params = json.load(f)
-                return jsonify(params)
-        else:
-            return jsonify({
-                "error": "Parameters file not found",
-                "message": "The smoker might not be running"
-            }), 404
+        return json_response(load_params())
+    except FileNotFoundError:
+        return json_response({
+            "error": "Parameters file not found",
+            "message": "The smoker might not be running"
+        }, 404)
     except Exception as e:
-        return jsonify({
+        return json_response({
             "error": "Failed to read parameters",
             "message": str(e)
-        }), 500
+        }, 500)
 
 # Control specific components
 @app.route('/api/control/air-temperature', methods=['POST'])
@@ -73,25 +317,14 @@ def set_air_temperature():
         
         # Validate temperature
         if temperature < 0 or temperature > 500:
-            return jsonify({"error": "Invalid temperature range (0-500)"}), 400
+            return json_response({"error": "Invalid temperature range (0-500)"}, 400)
             
-        # Read current parameters
-        params = {}
-        if os.path.exists(PARAMS_FILE):
-            with open(PARAMS_FILE, 'r') as f:
-                params = json.load(f)
-        
         # Update air temperature target
-        params['temp_air_target'] = temperature
-        params['timestamp'] = time.time()
+        update_params('temp_air_target', temperature)
         
-        # Write back to file
-        with open(PARAMS_FILE, 'w') as f:
-            json.dump(params, f)
-            
-        return jsonify({"success": True, "temperature": temperature})
+        return json_response({"success": True, "temperature": temperature})
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return json_response({"error": str(e)}, 500)
 
 
 @app.route('/api/control/meat-temperature', methods=['POST'])
@@ -102,25 +335,14 @@ def set_meat_temperature():
         
         # Validate temperature
         if temperature < 0 or temperature > 300:
-            return jsonify({"error": "Invalid temperature range (0-300)"}), 400
+            return json_response({"error": "Invalid temperature range (0-300)"}, 400)
             
-        # Read current parameters
-        params = {}
-        if os.path.exists(PARAMS_FILE):
-            with open(PARAMS_FILE, 'r') as f:
-                params = json.load(f)
-        
         # Update meat temperature target
-        params['temp_meat_1_target'] = temperature
-        params['timestamp'] = time.time()
+        update_params('temp_meat_1_target', temperature)
         
-        # Write back to file
-        with open(PARAMS_FILE, 'w') as f:
-            json.dump(params, f)
-            
-        return jsonify({"success": True, "temperature": temperature})
+        return json_response({"success": True, "temperature": temperature})
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return json_response({"error": str(e)}, 500)
 
 @app.route('/api/control/cooking-state', methods=['POST'])
 def set_cooking_state():
@@ -128,23 +350,12 @@ def set_cooking_state():
         data = request.get_json()
         state = bool(data.get('state'))
         
-        # Read current parameters
-        params = {}
-        if os.path.exists(PARAMS_FILE):
-            with open(PARAMS_FILE, 'r') as f:
-                params = json.load(f)
-        
         # Update cooking state
-        params['cooking_on'] = state
-        params['timestamp'] = time.time()
+        update_params('cooking_on', state)
         
-        # Write back to file
-        with open(PARAMS_FILE, 'w') as f:
-            json.dump(params, f)
-            
-        return jsonify({"success": True, "state": state})
+        return json_response({"success": True, "state": state})
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return json_response({"error": str(e)}, 500)
 
 @app.route('/api/control/smoker-rate', methods=['POST'])
 def set_smoker_rate():
@@ -154,51 +365,31 @@ def set_smoker_rate():
         
         # Validate rate (assuming valid range is 0-100)
         if rate < 0 or rate > 100:
-            return jsonify({"error": "Invalid smoker rate range (0-100)"}), 400
+            return json_response({"error": "Invalid smoker rate range (0-100)"}, 400)
             
-        # Read current parameters
-        params = {}
-        if os.path.exists(PARAMS_FILE):
-            with open(PARAMS_FILE, 'r') as f:
-                params = json.load(f)
-        
         # Update smoker rate
-        params['smoker_rate'] = rate
-        params['timestamp'] = time.time()
+        update_params('smoker_rate', rate)
         
-        # Write back to file
-        with open(PARAMS_FILE, 'w') as f:
-            json.dump(params, f)
-            
-        return jsonify({"success": True, "rate": rate})
+        return json_response({"success": True, "rate": rate})
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-@app.route('/api/data/air-temperatures')
-def get_air_temperatures():
-    # Get query parameters with default of 6h ago to now
-    from_time = request.args.get('from', '-6h')
-    
-    # Convert relative time to absolute time
-    if from_time.startswith('-'):
-        # Calculate absolute time based on the relative duration
-        duration = from_time[1:]
-        # Use a simple string-based approach that InfluxDB understands
-        from_time_flux = f"-{duration}"
-    else:
-        from_time_flux = from_time
+        return json_response({"error": str(e)}, 500)
 
-    # Build Flux query with proper time format
-    query = f'''
+# Flux query for air temperatures
+AIR_TEMPERATURES_QUERY = Template(f'''
     from(bucket: "{INFLUX_BUCKET}")
-      |> range(start: {from_time_flux})
+      |> range(start: $start)
       |> filter(fn: (r) => r._measurement == "smoker_telemetry")
       |> filter(fn: (r) => r.sensor == "temp_air_bottom" or r.sensor == "temp_air_top")
       |> filter(fn: (r) => r._field == "temperature")
-    '''
+    ''')
+
+@app.route('/api/data/air-temperatures')
+@cache_json(response_cache, RESPONSE_CACHE_TTL)
+def get_air_temperatures():
+    # Get query parameters with default of 6h ago to now
+    from_time = get_from_time()
     
-    client = get_influxdb_client()
-    query_api = client.query_api()
+    query = build_query(AIR_TEMPERATURES_QUERY, from_time)
     
     try:
         result = query_api.query(query=query)
@@ -212,45 +403,36 @@ def get_air_temperatures():
         for table in result:
             for record in table.records:
                 sensor = record.values.get('sensor')
-                timestamp = record.get_time().isoformat()
+                timestamp = int(record.get_time().timestamp() * 1000)
                 value = record.get_value()
                 
                 if sensor == 'temp_air_top':
-                    data["temp_air_top"].append({"time": timestamp, "value": value})
+                    data["temp_air_top"].append({"t": timestamp, "v": value})
                 elif sensor == 'temp_air_bottom':
-                    data["temp_air_bottom"].append({"time": timestamp, "value": value})
+                    data["temp_air_bottom"].append({"t": timestamp, "v": value})
         
-        return jsonify(data)
+        return json_response(data)
     except Exception as e:
         # Log the error but return empty data to prevent UI from breaking
         print(f"Error querying air temperatures: {str(e)}")
-        return jsonify({"temp_air_top": [], "temp_air_bottom": []})
+        return failed_query_response({"temp_air_top": [], "temp_air_bottom": []})
 
-@app.route('/api/data/meat-temperatures')
-def get_meat_temperatures():
-    # Get query parameters with default of 6h ago to now
-    from_time = request.args.get('from', '-6h')
-    
-    # Convert relative time to absolute time
-    if from_time.startswith('-'):
-        # Calculate absolute time based on the relative duration
-        duration = from_time[1:]
-        # Use a simple string-based approach that InfluxDB understands
-        from_time_flux = f"-{duration}"
-    else:
-        from_time_flux = from_time
-
-    # Build Flux query with proper time format
-    query = f'''
+# Flux query for meat temperatures
+MEAT_TEMPERATURES_QUERY = Template(f'''
     from(bucket: "{INFLUX_BUCKET}")
-      |> range(start: {from_time_flux})
+      |> range(start: $start)
       |> filter(fn: (r) => r._measurement == "smoker_telemetry")
       |> filter(fn: (r) => r.sensor == "temp_meat_1")
       |> filter(fn: (r) => r._field == "temperature")
-    '''
+    ''')
+
+@app.route('/api/data/meat-temperatures')
+@cache_json(response_cache, RESPONSE_CACHE_TTL)
+def get_meat_temperatures():
+    # Get query parameters with default of 6h ago to now
+    from_time = get_from_time()
     
-    client = get_influxdb_client()
-    query_api = client.query_api()
+    query = build_query(MEAT_TEMPERATURES_QUERY, from_time)
     
     try:
         result = query_api.query(query=query)
@@ -262,41 +444,32 @@ def get_meat_temperatures():
         
         for table in result:
             for record in table.records:
-                timestamp = record.get_time().isoformat()
+                timestamp = int(record.get_time().timestamp() * 1000)
                 value = record.get_value()
-                data["temp_meat_1"].append({"time": timestamp, "value": value})
+                data["temp_meat_1"].append({"t": timestamp, "v": value})
         
-        return jsonify(data)
+        return json_response(data)
     except Exception as e:
         # Log the error but return empty data to prevent UI from breaking
         print(f"Error querying meat temperatures: {str(e)}")
-        return jsonify({"temp_meat_1": []})
-
-@app.route('/api/data/target-temperatures')
-def get_target_temperatures():
-    # Get query parameters with default of 6h ago to now
-    from_time = request.args.get('from', '-6h')
-    
-    # Convert relative time to absolute time
-    if from_time.startswith('-'):
-        # Calculate absolute time based on the relative duration
-        duration = from_time[1:]
-        # Use a simple string-based approach that InfluxDB understands
-        from_time_flux = f"-{duration}"
-    else:
-        from_time_flux = from_time
+        return failed_query_response({"temp_meat_1": []})
 
-    # Build Flux query with proper time format
-    query = f'''
+# Flux query for target temperatures
+TARGET_TEMPERATURES_QUERY = Template(f'''
     from(bucket: "{INFLUX_BUCKET}")
-      |> range(start: {from_time_flux})
+      |> range(start: $start)
       |> filter(fn: (r) => r._measurement == "smoker_parameters")
       |> filter(fn: (r) => r.target == "temp_air" or r.target == "temp_meat_1")
       |> filter(fn: (r) => r._field == "temperature")
-    '''
+    ''')
+
+@app.route('/api/data/target-temperatures')
+@cache_json(response_cache, RESPONSE_CACHE_TTL)
+def get_target_temperatures():
+    # Get query parameters with default of 6h ago to now
+    from_time = get_from_time()
     
-    client = get_influxdb_client()
-    query_api = client.query_api()
+    query = build_query(TARGET_TEMPERATURES_QUERY, from_time)
     
     try:
         result = query_api.query(query=query)
@@ -310,92 +483,122 @@ def get_target_temperatures():
         for table in result:
             for record in table.records:
                 target = record.values.get('target')
-                timestamp = record.get_time().isoformat()
+                timestamp = int(record.get_time().timestamp() * 1000)
                 value = record.get_value()
                 
                 if target == 'temp_air':
-                    data["temp_air_target"].append({"time": timestamp, "value": value})
+                    data["temp_air_target"].append({"t": timestamp, "v": value})
                 elif target == 'temp_meat_1':
-                    data["temp_meat_target"].append({"time": timestamp, "value": value})
+                    data["temp_meat_target"].append({"t": timestamp, "v": value})
         
-        return jsonify(data)
+        return json_response(data)
     except Exception as e:
         # Log the error but return empty data to prevent UI from breaking
         print(f"Error querying target temperatures: {str(e)}")
-        return jsonify({"temp_air_target": [], "temp_meat_target": []})
+        return failed_query_response({"temp_air_target": [], "temp_meat_target": []})
+
+# Flux query for component state
+# Shaped in InfluxDB like the dashboard query, each component is renamed to its series and the on/off states become 1/0
+COMPONENT_STATE_QUERY = Template(f'''
+    from(bucket: "{INFLUX_BUCKET}")
+      |> range(start: $start)
+      |> filter(fn: (r) => r._measurement == "smoker_state")
+      |> filter(fn: (r) => r.component == "cooking_state" or r.component == "fan_state" or r.component == "heater_state" or r.component == "smoker_rate")
+      |> filter(fn: (r) => r._field == "active" or r._field == "rate")
+      |> map(fn: (r) => ({{
+          t: int(v: r._time) / 1000000,
+          series: if r.component == "cooking_state" then "cooking" else if r.component == "fan_state" then "fan" else if r.component == "heater_state" then "heater" else "smoker_rate",
+          v: int(v: r._value)
+      }}))
+      |> keep(columns: ["t", "series", "v"])
+    ''')
 
 @app.route('/api/data/component-state')
+@cache_json(response_cache, RESPONSE_CACHE_TTL)
 def get_component_state():
     # Get query parameters with default of 6h ago to now
-    from_time = request.args.get('from', '-6h')
+    from_time = get_from_time()
     
-    # Convert relative time to absolute time
-    if from_time.startswith('-'):
-        # Calculate absolute time based on the relative duration
-        duration = from_time[1:]
-        # Use a simple string-based approach that InfluxDB understands
-        from_time_flux = f"-{duration}"
-    else:
-        from_time_flux = from_time
+    query = build_query(COMPONENT_STATE_QUERY, from_time)
+    
+    return Response(stream_series(query, COMPONENT_SERIES), mimetype='application/json')
 
-    # Build Flux query with proper time format
-    query = f'''
-    from(bucket: "{INFLUX_BUCKET}")
-      |> range(start: {from_time_flux})
+# Flux query for all dashboard data
+# One Flux script, every chart's filter shares the same range scan and is returned as its own named result
+# Each result is downsampled and already shaped in InfluxDB into the dashboard series name and a plain value
+# Window means are rounded back to whole degrees, the current temperature panels read /api/status instead
+ALL_DATA_QUERY = Template(f'''
+    import "math"
+
+    data = from(bucket: "{INFLUX_BUCKET}")
+      |> range(start: $start)
+
+    data
+      |> filter(fn: (r) => r._measurement == "smoker_telemetry")
+      |> filter(fn: (r) => r.sensor == "temp_air_top" or r.sensor == "temp_air_bottom")
+      |> filter(fn: (r) => r._field == "temperature")
+      |> aggregateWindow(every: $every, fn: mean, createEmpty: false)
+      |> map(fn: (r) => ({{t: int(v: r._time) / 1000000, series: r.sensor, v: int(v: math.round(x: r._value))}}))
+      |> keep(columns: ["t", "series", "v"])
+      |> yield(name: "airTemps")
+
+    data
+      |> filter(fn: (r) => r._measurement == "smoker_telemetry")
+      |> filter(fn: (r) => r.sensor == "temp_meat_1")
+      |> filter(fn: (r) => r._field == "temperature")
+      |> aggregateWindow(every: $every, fn: mean, createEmpty: false)
+      |> map(fn: (r) => ({{t: int(v: r._time) / 1000000, series: r.sensor, v: int(v: math.round(x: r._value))}}))
+      |> keep(columns: ["t", "series", "v"])
+      |> yield(name: "meatTemps")
+
+    data
+      |> filter(fn: (r) => r._measurement == "smoker_parameters")
+      |> filter(fn: (r) => r.target == "temp_air" or r.target == "temp_meat_1")
+      |> filter(fn: (r) => r._field == "temperature")
+      |> aggregateWindow(every: $every, fn: mean, createEmpty: false)
+      |> map(fn: (r) => ({{t: int(v: r._time) / 1000000, series: if r.target == "temp_air" then "temp_air_target" else "temp_meat_target", v: int(v: math.round(x: r._value))}}))
+      |> keep(columns: ["t", "series", "v"])
+      |> yield(name: "targetTemps")
+
+    data
       |> filter(fn: (r) => r._measurement == "smoker_state")
+      |> filter(fn: (r) => r.component == "cooking_state" or r.component == "fan_state" or r.component == "heater_state" or r.component == "smoker_rate")
       |> filter(fn: (r) => r._field == "active" or r._field == "rate")
-    '''
+      |> aggregateWindow(every: $every, fn: last, createEmpty: false)
+      |> map(fn: (r) => ({{
+          t: int(v: r._time) / 1000000,
+          series: if r.component == "cooking_state" then "cooking" else if r.component == "fan_state" then "fan" else if r.component == "heater_state" then "heater" else "smoker_rate",
+          v: int(v: r._value)
+      }}))
+      |> keep(columns: ["t", "series", "v"])
+      |> yield(name: "componentState")
+    ''')
+
+# Get all dashboard chart data with a single InfluxDB query
+@app.route('/api/data/all')
+@cache_json(response_cache, RESPONSE_CACHE_TTL)
+def get_all_data():
+    # Get query parameters with default of 6h ago to now
+    from_time = get_from_time()
     
-    client = get_influxdb_client()
-    query_api = client.query_api()
+    query = build_query(ALL_DATA_QUERY, from_time)
     
-    try:
-        result = query_api.query(query=query)
-        
-        # Process data for Plotly
-        data = {
-            "cooking": [],
-            "fan": [],
-            "heater": [],
-            "smoker_rate": []
-        }
-        
-        for table in result:
-            for record in table.records:
-                component = record.values.get('component')
-                timestamp = record.get_time().isoformat()
-                
-                if component == 'smoker_rate':
-                    # For smoker_rate, use the actual value
-                    value = record.get_value()
-                    data["smoker_rate"].append({"time": timestamp, "value": value})
-                elif component in data:
-                    # For boolean components, convert to 1/0
-                    value = 1 if record.get_value() else 0
-                    data[component].append({"time": timestamp, "value": value})
-        
-        return jsonify(data)
-    except Exception as e:
-        # Log the error but return empty data to prevent UI from breaking
-        print(f"Error querying component state: {str(e)}")
-        return jsonify({"cooking": [], "fan": [], "heater": [], "smoker_rate": []})
+    return Response(stream_series(query), mimetype='application/json')
+
+# Flux query to get the most recent telemetry data, it never changes so it is built once
+STATUS_QUERY = f'''
+from(bucket: "{INFLUX_BUCKET}") 
+  |> range(start: -1m)
+  |> filter(fn: (r) => r._measurement == "smoker_telemetry" or r._measurement == "smoker_state")
+  |> last()
+'''
 
 # Get current smoker status
 @app.route('/api/status', methods=['GET'])
+@cache_json(status_cache, STATUS_CACHE_TTL, status_refresh_lock)
 def get_current_status():
     try:
-        client = get_influxdb_client()
-        query_api = client.query_api()
-        
-        # Build Flux query to get the most recent telemetry data
-        query = f'''
-        from(bucket: "{INFLUX_BUCKET}") 
-          |> range(start: -1m)
-          |> filter(fn: (r) => r._measurement == "smoker_telemetry" or r._measurement == "smoker_state")
-          |> last()
-        '''
-        
-        result = query_api.query(query=query)
+        result = query_api.query(query=STATUS_QUERY)
         
         # Process the results into a status object
         status = {
@@ -416,7 +619,7 @@ def get_current_status():
         for table in result:
             for record in table.records:
                 # Update last_updated time with the most recent timestamp
-                record_time = record.get_time().isoformat()
+                record_time = record.get_time()
                 if status["last_updated"] is None or record_time > status["last_updated"]:
                     status["last_updated"] = record_time
                 
@@ -443,27 +646,22 @@ def get_current_status():
                         status["state"]["smoker_rate"] = record.get_value()
         
         # Get the current target temperatures from parameters file
-        if os.path.exists(PARAMS_FILE):
-            with open(PARAMS_FILE, 'r') as f:
-                params = json.load(f)
-                status["target"] = {
-                    "air": params.get('temp_air_target', temp_air_target),
-                    "meat_1": params.get('temp_meat_1_target', temp_meat_target)
-                }
-        else:
+        try:
+            params = load_params()
+            status["target"] = {
+                "air": params.get('temp_air_target', temp_air_target),
+                "meat_1": params.get('temp_meat_1_target', temp_meat_target)
+            }
+        except FileNotFoundError:
             status["target"] = {
                 "air": temp_air_target,
                 "meat_1": temp_meat_target
             }
             
-        return jsonify(status)
+        return json_response(status)
     except Exception as e:
         print(f"Error getting current status: {str(e)}")
-        return jsonify({
+        return json_response({
             "error": "Failed to retrieve current status",
             "message": str(e)
-        }), 500
-
-if __name__ == "__main__":
-    app.run(host='0.0.0.0', port=8080, debug=True)
-
+        }, 500)
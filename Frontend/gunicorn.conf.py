@@ -0,0 +1,9 @@
+# Gunicorn settings for the OpenSmoker web app, loaded automatically when gunicorn is started from this directory:
+#   gunicorn Flask_WebApp:app
+bind = "0.0.0.0:8080"
+
+# Threads overlap requests waiting on InfluxDB
+# Only one worker process, the web app holds the smoker parameters in memory and they must not be split between processes
+worker_class = "gthread"
+workers = 1
+threads = 8
@@ -30,6 +30,7 @@
 #include <Adafruit_MAX31865.h>
 #include <Adafruit_MCP9600.h>
 #include <hardware/watchdog.h>
+#include <hardware/gpio.h>
 
 // ********************************************************************************************************************
 // Constants
@@ -74,8 +75,11 @@
 #define TEMP_AIR_BOTTOM_ADDR    0x67
 
 #define LOOP_TIMEOUT             5000  // 5 seconds watchdog timeout for each loop
+#define CONTROL_INTERVAL         1000  // Control loop period in milliseconds
 #define TELEMETRY_INTERVAL       1000
 #define SERIAL_FLUSH_INTERVAL   30000
+#define SERIAL_MESSAGE_SIZE     64     // Maximum length of a received serial command
+#define TELEMETRY_MESSAGE_SIZE  256    // Maximum length of a serialized telemetry line
 
 // ********************************************************************************************************************
 // Global Variables
@@ -88,13 +92,16 @@ int temp_meat_value             = 0;  // Meat temperature
 
 // State variables
 bool cooking_state              = false;  // Cooking/System on/off state
-long last_cooking_message_time  = 0;
-long last_message_time          = 0;      // Last message time
-long startup_time               = 0;      // Startup time
-long last_successful_temp_read  = 0;      // Last successful temperature read time
-long last_heartbeat             = 0;      // Last heartbeat time
-long last_buffer_flush          = 0;      // Last buffer flush time
-int consecutive_read_errors     = 0;      // Number of consecutive read errors
+unsigned long last_cooking_message_time = 0;
+unsigned long last_successful_temp_read = 0;  // Last successful temperature read time
+unsigned long last_heartbeat    = 0;      // Last heartbeat time
+unsigned long last_buffer_flush = 0;      // Last buffer flush time
+
+// Serial receive buffer, reused for every message to avoid heap allocations
+char serial_message[SERIAL_MESSAGE_SIZE];
+
+// Telemetry transmit buffer, reused so each report goes out in a single write
+char telemetry_message[TELEMETRY_MESSAGE_SIZE];
 
 // Fan state
 bool fan_state                  = false;
@@ -105,14 +112,15 @@ bool heater_state               = false;
 // Smoker state
 bool smoker_state               = false;  // Smoker on/off state
 int smoker_rate                 = 0;      // Smoker % on rate/duty cycle
-unsigned long smoker_last_toggle_time = 0;      // Last smoker toggle time
 
 // Watchdog tracking variables
-long last_loop0_time            = 0;      // Last loop0 time
-long last_loop1_time            = 0;      // Last loop1 time
+unsigned long last_loop0_time   = 0;      // Last loop0 time
+unsigned long last_loop1_time   = 0;      // Last loop1 time
+unsigned long next_control_time = 0;      // Deadline for the next control loop iteration
 
 // Temperature sensor objects
-Adafruit_MAX31865 temp_meat_1(TEMP_MEAT_SPI_CS, TEMP_MEAT_SPI_MOSI, TEMP_MEAT_SPI_MISO, TEMP_MEAT_SPI_SCK);
+// The meat probe pins (GP18/19/20) map onto the SPI0 peripheral, so use hardware SPI rather than bit-banging
+Adafruit_MAX31865 temp_meat_1(TEMP_MEAT_SPI_CS, &SPI);
 
 Ambient_Resolution ambientRes = RES_ZERO_POINT_0625;
 Adafruit_MCP9600 temp_air_top;
@@ -132,6 +140,7 @@ void setup() {
     // Initialize loop monitoring
     last_loop0_time = millis();
     last_loop1_time = millis();
+    next_control_time = millis();
 
     // Initialize I2C
     Wire.setSDA(I2C_SDA_PIN);
@@ -160,6 +169,9 @@ void setup() {
 
 
     // Meat Temp Probe
+    SPI.setRX(TEMP_MEAT_SPI_MISO);
+    SPI.setTX(TEMP_MEAT_SPI_MOSI);
+    SPI.setSCK(TEMP_MEAT_SPI_SCK);
     temp_meat_1.begin(MAX31865_3WIRE);
 
     // Air Temp Probes
@@ -217,9 +229,9 @@ void loop() {
         Serial.println("ERROR: loop1() has failed, not petting watchdog!");
     }
 
-    // Meat Temp Probe
+    // Meat Temp Probe (single one-shot conversion, ~75 ms blocking)
     uint16_t rtd = temp_meat_1.readRTD();
-    temp_meat_value = celsius_to_fahrenheit(temp_meat_1.temperature(RNOMINAL, RREF));
+    temp_meat_value = celsius_to_fahrenheit(temp_meat_1.calculateTemperature(rtd, RNOMINAL, RREF));
 
     // Check and print any faults with the meat temp probe
     uint8_t fault = temp_meat_1.readFault();
@@ -258,7 +270,15 @@ void loop() {
     control_heater();
     control_smoker();
 
-    delay(1000);
+    // Sleep until the next deadline so the period does not drift with sensor read time
+    next_control_time += CONTROL_INTERVAL;
+    long remaining = (long)(next_control_time - millis());
+    if (remaining > 0) {
+        delay(remaining);
+    } else {
+        // Overran the deadline, resynchronise instead of running back-to-back iterations
+        next_control_time = millis();
+    }
 }
 
 
@@ -296,17 +316,21 @@ void loop1() {
 // Functions
 // ********************************************************************************************************************
 
+// Relays are switched with gpio_put(), a single SIO register write, instead of
+// digitalWrite() which re-validates the pin on every call.
 
 void control_cooking_state() {
-    if (last_cooking_message_time + COOKING_TIMEOUT < millis()) {
+    // Unsigned subtraction stays correct across the ~49 day millis() rollover
+    if (millis() - last_cooking_message_time > COOKING_TIMEOUT) {
         cooking_state = false;
     }
 }
 
 
 // Convert Celsius to Fahrenheit and return as integer
+// Single-precision literals keep this off the much slower double-precision math routines
 int celsius_to_fahrenheit(float celsius) {
-    return (int)((celsius * 9.0/5.0) + 32.0);
+    return (int)(celsius * 1.8f + 32.0f);
 }
 
 
@@ -314,21 +338,21 @@ void control_fan() {
     // Check if we have valid temperature readings
     if (isnan(temp_air_top_value) || isnan(temp_air_bottom_value)) {
         Serial.println("ERROR: Invalid temperature readings for fan control");
-        digitalWrite(FAN_RELAY_PIN, LOW);
+        gpio_put(FAN_RELAY_PIN, LOW);
         return;
     }
 
     if (cooking_state == false) {
-        digitalWrite(FAN_RELAY_PIN, LOW);
+        gpio_put(FAN_RELAY_PIN, LOW);
         fan_state = false;
         return;
     }
     
     if (abs(temp_air_top_value - temp_air_bottom_value) > FAN_ON_TEMP_DIFF) {
-        digitalWrite(FAN_RELAY_PIN, HIGH);
+        gpio_put(FAN_RELAY_PIN, HIGH);
         fan_state = true;
     } else if (abs(temp_air_top_value - temp_air_bottom_value) < FAN_OFF_TEMP_DIFF) {
-        digitalWrite(FAN_RELAY_PIN, LOW);
+        gpio_put(FAN_RELAY_PIN, LOW);
         fan_state = false;
     }
 }
@@ -338,21 +362,21 @@ void control_heater() {
     // Check if we have valid temperature readings
     if (isnan(temp_air_top_value) || isnan(temp_air_bottom_value) || isnan(temp_meat_value)) {
         Serial.println("ERROR: Invalid temperature readings for heater control");
-        digitalWrite(HEATER_RELAY_PIN, LOW);
+        gpio_put(HEATER_RELAY_PIN, LOW);
         return;
     }
     
     // Check for maximum safe temperature (already in Fahrenheit)
     if (temp_air_top_value > MAX_SAFE_TEMP || temp_air_bottom_value > MAX_SAFE_TEMP || temp_meat_value > MAX_SAFE_TEMP) {
         Serial.println("ERROR: Maximum safe temperature exceeded, disabling heater.");
-        digitalWrite(HEATER_RELAY_PIN, LOW);
+        gpio_put(HEATER_RELAY_PIN, LOW);
         heater_state = false;
         return;
     }
     
     // Check for timeout since last heater command
     if (cooking_state == false) {
-        digitalWrite(HEATER_RELAY_PIN, LOW);
+        gpio_put(HEATER_RELAY_PIN, LOW);
         heater_state = false;
         return;
     }
@@ -360,23 +384,23 @@ void control_heater() {
     // Check for temperature sensor timeouts
     if (millis() - last_successful_temp_read > TEMP_READ_TIMEOUT) {
         Serial.println("ERROR: Temperature sensor timeout, disabling heater.");
-        digitalWrite(HEATER_RELAY_PIN, LOW);
+        gpio_put(HEATER_RELAY_PIN, LOW);
         heater_state = false;
         return;
     }
 
     // Control the heater
     if (heater_state == true) {
-        digitalWrite(HEATER_RELAY_PIN, HIGH);
+        gpio_put(HEATER_RELAY_PIN, HIGH);
     } else if (heater_state == false) {
-        digitalWrite(HEATER_RELAY_PIN, LOW);
+        gpio_put(HEATER_RELAY_PIN, LOW);
     }
 }
 
 
 void control_smoker() {
     if (cooking_state == false) {
-        digitalWrite(SMOKER_RELAY_PIN, LOW);
+        gpio_put(SMOKER_RELAY_PIN, LOW);
         smoker_state = false;
         return;
     }
@@ -390,57 +414,77 @@ void control_smoker() {
     
     // If rate is 0, ensure smoker is off
     if (smoker_rate <= 0) {
-        digitalWrite(SMOKER_RELAY_PIN, LOW);
+        gpio_put(SMOKER_RELAY_PIN, LOW);
         smoker_state = false;
     }
     // If rate is 100 or greater, ensure smoker is on
     else if (smoker_rate >= 100) {
-        digitalWrite(SMOKER_RELAY_PIN, HIGH);
+        gpio_put(SMOKER_RELAY_PIN, HIGH);
         smoker_state = true;
     }
     // Otherwise, implement the duty cycle
     else {
         // If we're in the "on" portion of the cycle
         if (cycle_position < on_time) {
-            digitalWrite(SMOKER_RELAY_PIN, HIGH);
+            gpio_put(SMOKER_RELAY_PIN, HIGH);
             smoker_state = true;
         } 
         // If we're in the "off" portion of the cycle
         else {
-            digitalWrite(SMOKER_RELAY_PIN, LOW);
+            gpio_put(SMOKER_RELAY_PIN, LOW);
             smoker_state = false;
         }
     }
 }
 
 void receive_serial_message() {
-    if (Serial.available()) {
-        String message = Serial.readStringUntil('\n');
-        message.trim();
+    // Handle every queued command in one pass rather than one per loop1() wake-up
+    while (Serial.available()) {
+        size_t length = Serial.readBytesUntil('\n', serial_message, SERIAL_MESSAGE_SIZE - 1);
+
+        // Trim surrounding whitespace in place
+        while (length > 0 && isspace(serial_message[length - 1])) {
+            length--;
+        }
+        serial_message[length] = '\0';
+        char *message = serial_message;
+        while (isspace(*message)) {
+            message++;
+        }
         Serial.print("DEBUG: Received message: "); Serial.println(message);
         
-        // Parse the message
-        if (message.startsWith("HEATER_STATE")) {
-            // Extract the state from the message
-            int state = message.substring(13).toInt();
-            if (state == 1) {
-                heater_state = true;
-            } else if (state == 0) {
-                heater_state = false;
-            }
-            Serial.print("DEBUG: Heater state set to: "); Serial.println(heater_state);
-        } else if (message.startsWith("SMOKER_RATE")) {
-            // Extract the rate from the message
-            int rate = message.substring(12).toInt();
-            smoker_rate = rate;
-            Serial.print("DEBUG: Smoker rate set to: "); Serial.println(smoker_rate);
-        } else if (message.startsWith("COOKING_STATE")) {
-            // Extract the state from the message
-            int state = message.substring(14).toInt();
-            cooking_state = state == 1;
-            last_cooking_message_time = millis();
-            // Serial.print("DEBUG: Cooking state set to: "); Serial.println(cooking_state);
-
+        // Parse the message, dispatching on the first character so each
+        // message needs at most one prefix comparison
+        switch (message[0]) {
+            case 'H':
+                if (strncmp(message, "HEATER_STATE", 12) == 0) {
+                    // Extract the state from the message
+                    int state = atoi(message + 12);
+                    if (state == 1) {
+                        heater_state = true;
+                    } else if (state == 0) {
+                        heater_state = false;
+                    }
+                    Serial.print("DEBUG: Heater state set to: "); Serial.println(heater_state);
+                }
+                break;
+            case 'S':
+                if (strncmp(message, "SMOKER_RATE", 11) == 0) {
+                    // Extract the rate from the message
+                    int rate = atoi(message + 11);
+                    smoker_rate = rate;
+                    Serial.print("DEBUG: Smoker rate set to: "); Serial.println(smoker_rate);
+                }
+                break;
+            case 'C':
+                if (strncmp(message, "COOKING_STATE", 13) == 0) {
+                    // Extract the state from the message
+                    int state = atoi(message + 13);
+                    cooking_state = state == 1;
+                    last_cooking_message_time = millis();
+                    // Serial.print("DEBUG: Cooking state set to: "); Serial.println(cooking_state);
+                }
+                break;
         }
     }
 }
@@ -461,9 +505,11 @@ void send_telemetry() {
     doc["smoker_state"] = smoker_state ? "ON" : "OFF";
     doc["smoker_rate"] = smoker_rate;
     
-    // Serialize JSON to Serial
-    serializeJson(doc, Serial);
-    Serial.println();
+    // Serialize JSON into the transmit buffer, leaving room for the line ending
+    size_t length = serializeJson(doc, telemetry_message, TELEMETRY_MESSAGE_SIZE - 2);
+    telemetry_message[length++] = '\r';
+    telemetry_message[length++] = '\n';
+    Serial.write(telemetry_message, length);
     
     // Serial.println("DEBUG: Telemetry message sent.");
 }